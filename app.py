@@ -1,11 +1,26 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 from flask_cors import CORS
 import pdfplumber
 from docx import Document
 import json
+import argparse
+import atexit
+from contextlib import contextmanager
+import gzip
+import hashlib
+import math
 import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 import boto3
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError, ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
 import requests
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
@@ -17,76 +32,917 @@ app = Flask(__name__)
 CORS(app)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-class ResumeParser:
+@app.after_request
+def compress_response(response):
+    """Gzip JSON responses for clients that accept it"""
+    if (response.status_code != 200
+            or response.mimetype != 'application/json'
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+        return response
+    
+    data = response.get_data()
+    if len(data) < 1024:
+        return response
+    
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+class Tracer:
+    """Per-request span timing with an optional sampling profiler.
+    
+    Each request gets a trace (keyed by X-Request-ID when the client sends
+    one of at most 64 letters, digits or hyphens) collected in
+    thread-local state; span() is a no-op outside a request, so shared
+    code can be instrumented freely. Finished traces go
+    to an in-memory ring buffer and, if TRACE_FILE is set, a JSONL file.
+    The buffer is served at GET /debug/traces only when
+    TRACE_DEBUG_ENDPOINT=true.
+    
+    With TRACE_PROFILE=true a daemon thread samples the stacks of threads
+    serving requests every TRACE_SAMPLE_INTERVAL_MS; samples are kept only
+    for requests slower than TRACE_PROFILE_THRESHOLD_MS.
+    """
     def __init__(self):
-        self.bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+        self.enabled = os.getenv('TRACING_ENABLED', 'True').lower() == 'true'
+        self.buffer = deque(maxlen=int(os.getenv('TRACE_BUFFER_SIZE', '200')))
+        self.sink_file = os.getenv('TRACE_FILE')
+        self.profile = os.getenv('TRACE_PROFILE', 'False').lower() == 'true'
+        self.profile_threshold_ms = float(os.getenv('TRACE_PROFILE_THRESHOLD_MS', '2000'))
+        self.sample_interval = float(os.getenv('TRACE_SAMPLE_INTERVAL_MS', '10')) / 1000
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.active = {}
+        self.dropped = 0
         
-    def extract_text_from_pdf(self, file_path):
-        text = ""
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-        return text
+        if self.enabled and self.sink_file:
+            # Requests only enqueue; one writer thread owns the open file
+            self.sink_queue = queue.Queue(maxsize=int(os.getenv('TRACE_QUEUE_SIZE', '10000')))
+            self.writer = threading.Thread(target=self._write_loop, daemon=True)
+            self.writer.start()
+            atexit.register(self._close_sink)
+        
+        if self.enabled and self.profile:
+            self.sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self.sampler.start()
     
-    def extract_text_from_docx(self, file_path):
-        doc = Document(file_path)
-        return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+    # Client-supplied ids are echoed, logged and listed, so only short
+    # plain ones are trusted
+    REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9-]{1,64}')
     
-    def parse_with_llm(self, text):
-        prompt = f"""Extract structured data from this resume text. Return ONLY valid JSON with these exact fields:
+    def start_trace(self, name, request_id=None):
+        if not self.enabled:
+            return None
+        if not (request_id and self.REQUEST_ID_PATTERN.fullmatch(request_id)):
+            request_id = uuid.uuid4().hex
+        trace = {
+            'request_id': request_id,
+            'name': name,
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'spans': [],
+            'samples': {},
+            'started': time.monotonic(),
+            'open_spans': []
+        }
+        self.local.trace = trace
+        with self.lock:
+            self.active[threading.get_ident()] = trace
+        return trace
+    
+    def set_status(self, status):
+        trace = getattr(self.local, 'trace', None)
+        if trace is not None:
+            trace['status'] = status
+    
+    def current_request_id(self):
+        trace = getattr(self.local, 'trace', None)
+        return trace['request_id'] if trace else None
+    
+    @contextmanager
+    def span(self, name, **attrs):
+        trace = getattr(self.local, 'trace', None)
+        if trace is None:
+            yield
+            return
+        
+        started = time.monotonic()
+        parent = trace['open_spans'][-1] if trace['open_spans'] else None
+        trace['open_spans'].append(name)
+        try:
+            yield
+        finally:
+            trace['open_spans'].pop()
+            span = {
+                'name': name,
+                'parent': parent,
+                'start_ms': round((started - trace['started']) * 1000, 2),
+                'duration_ms': round((time.monotonic() - started) * 1000, 2)
+            }
+            span.update(attrs)
+            trace['spans'].append(span)
+    
+    def finish_trace(self, status=None):
+        trace = getattr(self.local, 'trace', None)
+        if trace is None:
+            return None
+        self.local.trace = None
+        with self.lock:
+            self.active.pop(threading.get_ident(), None)
+            # The sampler may still be adding to this trace's samples
+            samples = dict(trace['samples'])
+        
+        duration_ms = (time.monotonic() - trace['started']) * 1000
+        record = {
+            'request_id': trace['request_id'],
+            'name': trace['name'],
+            'timestamp': trace['timestamp'],
+            'status': status or trace.get('status'),
+            'duration_ms': round(duration_ms, 2),
+            'spans': trace['spans']
+        }
+        if self.profile and duration_ms >= self.profile_threshold_ms and samples:
+            top = sorted(samples.items(), key=lambda item: item[1], reverse=True)[:20]
+            record['profile'] = {
+                'sample_interval_ms': self.sample_interval * 1000,
+                'stacks': [{'stack': stack, 'samples': count} for stack, count in top]
+            }
+        
+        with self.lock:
+            self.buffer.append(record)
+        if self.sink_file:
+            try:
+                self.sink_queue.put_nowait(record)
+            except queue.Full:
+                # Never block a request on the sink; count what we shed
+                with self.lock:
+                    self.dropped += 1
+        return record
+    
+    def _write_loop(self):
+        with open(self.sink_file, 'a') as f:
+            while True:
+                record = self.sink_queue.get()
+                # Drain whatever else is queued before one flush
+                batch = [record]
+                while record is not None:
+                    try:
+                        record = self.sink_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(record)
+                for item in batch:
+                    if item is None:
+                        f.flush()
+                        return
+                    f.write(json.dumps(item) + '\n')
+                f.flush()
+    
+    def _close_sink(self):
+        self.sink_queue.put(None)
+        self.writer.join(timeout=2)
+    
+    def recent(self, limit=50, min_ms=0):
+        with self.lock:
+            traces = [t for t in self.buffer if t['duration_ms'] >= min_ms]
+        return traces[-limit:]
+    
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.sample_interval)
+            with self.lock:
+                active = list(self.active.items())
+            if not active:
+                continue
+            
+            frames = sys._current_frames()
+            collected = []
+            for thread_id, trace in active:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and len(stack) < 40:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                if stack:
+                    collected.append((trace, ';'.join(reversed(stack))))
+            del frames
+            
+            with self.lock:
+                for trace, key in collected:
+                    trace['samples'][key] = trace['samples'].get(key, 0) + 1
+
+tracer = Tracer()
+
+@app.before_request
+def start_request_trace():
+    tracer.start_trace(f"{request.method} {request.path}", request.headers.get('X-Request-ID'))
+
+@app.after_request
+def tag_request_id(response):
+    tracer.set_status(response.status_code)
+    request_id = tracer.current_request_id()
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+@app.teardown_request
+def finish_request_trace(error=None):
+    tracer.finish_trace('error' if error else None)
+
+# Structured output specs per LLM call type. Each call is forced through a
+# single tool whose input_schema is the expected response shape, so Bedrock
+# returns parsed JSON instead of free text we have to scrape.
+RESUME_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": ["string", "null"]},
+        "email": {"type": ["string", "null"]},
+        "phone": {"type": ["string", "null"]},
+        "experience": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "company": {"type": "string"},
+                    "position": {"type": "string"},
+                    "duration": {"type": "string"},
+                    "description": {"type": "string"}
+                },
+                "required": ["company", "position"]
+            }
+        },
+        "education": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "institution": {"type": "string"},
+                    "degree": {"type": "string"},
+                    "year": {"type": ["string", "null"]},
+                    "gpa": {"type": ["string", "null"]}
+                },
+                "required": ["institution"]
+            }
+        },
+        "skills": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["name", "email", "phone", "experience", "education", "skills"]
+}
+
+QUESTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string"},
+                    "question": {"type": "string"}
+                },
+                "required": ["type", "question"]
+            }
+        }
+    },
+    "required": ["questions"]
+}
+
+ATS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "ats_score": {"type": "number"},
+        "suggested_roles": {"type": "array", "items": {"type": "string"}},
+        "best_role": {"type": "string"},
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "improvements": {"type": "array", "items": {"type": "string"}},
+        "keyword_density": {"type": "number"},
+        "format_score": {"type": "number"}
+    },
+    "required": ["ats_score", "suggested_roles", "best_role", "strengths", "improvements"]
+}
+
+ANSWER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "number"},
+        "feedback": {"type": "string"},
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "improvements": {"type": "array", "items": {"type": "string"}},
+        "overall_rating": {"type": "string"},
+        "progress_note": {"type": "string"}
+    },
+    "required": ["score", "feedback", "strengths", "improvements", "overall_rating"]
+}
+
+STRUCTURED_OUTPUTS = {
+    'parse': {
+        'tool_name': 'record_resume',
+        'description': 'Record the structured data extracted from a resume.',
+        'schema': RESUME_SCHEMA
+    },
+    'questions': {
+        'tool_name': 'record_questions',
+        'description': 'Record the generated interview questions.',
+        'schema': QUESTIONS_SCHEMA
+    },
+    'ats': {
+        'tool_name': 'record_ats_analysis',
+        'description': 'Record the ATS compatibility analysis of a resume.',
+        'schema': ATS_SCHEMA
+    },
+    'answer': {
+        'tool_name': 'record_answer_analysis',
+        'description': 'Record the score and feedback for an interview answer.',
+        'schema': ANSWER_SCHEMA
+    }
+}
+
+# Model routing per call type. Short answer scoring doesn't need the same
+# output budget as full resume extraction. Each field can be overridden with
+# LLM_<CALL_TYPE>_MODEL / _MAX_TOKENS / _TEMPERATURE in the environment.
+DEFAULT_MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
 
-{{
+LLM_ROUTES = {
+    'parse': {'model_id': DEFAULT_MODEL_ID, 'max_tokens': 2000, 'temperature': 0.0},
+    'questions': {'model_id': DEFAULT_MODEL_ID, 'max_tokens': 800, 'temperature': 0.7},
+    'ats': {'model_id': DEFAULT_MODEL_ID, 'max_tokens': 500, 'temperature': 0.0},
+    'answer': {'model_id': DEFAULT_MODEL_ID, 'max_tokens': 400, 'temperature': 0.2}
+}
+
+# Ceiling for the repair pass after a generation hit max_tokens
+MAX_REPAIR_TOKENS = 4096
+
+def load_llm_routes():
+    """Build the routing table with environment overrides applied"""
+    routes = {}
+    for call_type, defaults in LLM_ROUTES.items():
+        prefix = f"LLM_{call_type.upper()}_"
+        route = dict(defaults)
+        if os.getenv(prefix + 'MODEL'):
+            route['model_id'] = os.getenv(prefix + 'MODEL')
+        if os.getenv(prefix + 'MAX_TOKENS'):
+            route['max_tokens'] = int(os.getenv(prefix + 'MAX_TOKENS'))
+        if os.getenv(prefix + 'TEMPERATURE'):
+            route['temperature'] = float(os.getenv(prefix + 'TEMPERATURE'))
+        routes[call_type] = route
+    return routes
+
+# Static prompt prefixes. Variable data (resume text, answers, user context)
+# always goes in the suffix so providers with prompt caching can reuse the
+# prefix across calls. Enable cache markers with LLM_PROMPT_CACHING=true.
+RESUME_PARSE_PREFIX = """Extract structured data from the resume text that follows. Use these exact fields:
+
+{
   "name": "Full Name",
   "email": "email@example.com",
   "phone": "+1-234-567-8900",
   "experience": [
-    {{
+    {
       "company": "Company Name",
       "position": "Job Title",
       "duration": "Start - End dates",
       "description": "Key responsibilities and achievements"
-    }}
+    }
   ],
   "education": [
-    {{
+    {
       "institution": "University/School Name",
       "degree": "Degree Type and Major",
       "year": "Graduation Year",
       "gpa": "GPA if mentioned"
-    }}
+    }
   ],
   "skills": ["skill1", "skill2", "skill3"]
-}}
+}
 
-Resume text:
-{text}
+Record the result with the record_resume tool.
 
-Return ONLY the JSON object:"""
-        
+Resume text:"""
+
+QUESTIONS_PREFIX = """Based on the resume data that follows, generate 10 relevant interview questions.
+Include technical, behavioral, and experience-based questions.
+
+Use this structure:
+{
+  "questions": [
+    {"type": "technical", "question": "..."},
+    {"type": "behavioral", "question": "..."},
+    {"type": "experience", "question": "..."}
+  ]
+}
+
+Record the result with the record_questions tool.
+
+Resume data:"""
+
+ATS_PREFIX = """Analyze the resume data that follows for ATS compatibility and suggest specific job roles.
+
+Use this structure:
+{
+  "ats_score": 85,
+  "suggested_roles": ["Senior Software Engineer", "Full Stack Developer", "Backend Engineer"],
+  "best_role": "Senior Software Engineer",
+  "strengths": ["keyword1", "keyword2"],
+  "improvements": ["suggestion1", "suggestion2"],
+  "keyword_density": 75,
+  "format_score": 90
+}
+
+Record the result with the record_ats_analysis tool.
+
+Resume data:"""
+
+ANSWER_PREFIX = """Analyze the interview answer that follows and provide scoring with feedback.
+
+Use this structure:
+{
+  "score": 85,
+  "feedback": "Good answer with specific examples...",
+  "strengths": ["Clear communication", "Relevant experience"],
+  "improvements": ["Add more technical details", "Include metrics"],
+  "overall_rating": "Good"
+}
+
+Record the result with the record_answer_analysis tool."""
+
+ANSWER_CONTEXT_PREFIX = """Analyze the interview answer that follows considering the user's learning journey.
+
+Provide personalized feedback that:
+1. Acknowledges their progress if improving
+2. Addresses recurring weak areas specifically
+3. Adjusts expectations based on their skill level
+4. Provides targeted next steps for improvement
+
+Use this structure:
+{
+  "score": 85,
+  "feedback": "Personalized feedback based on learning journey...",
+  "strengths": ["Clear communication", "Relevant experience"],
+  "improvements": ["Targeted suggestions based on history"],
+  "overall_rating": "Good",
+  "progress_note": "Improvement/decline note based on trend"
+}
+
+Record the result with the record_answer_analysis tool."""
+
+REPAIR_PREFIX = """The output that follows does not match the required schema.
+Fix it using the validation errors and return the corrected data with the tool."""
+
+_JSON_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'number': (int, float),
+    'integer': int,
+    'boolean': bool,
+    'null': type(None)
+}
+
+def validate_schema(value, schema, path='$'):
+    """Return a list of schema violations for value (empty when valid)"""
+    errors = []
+    expected = schema.get('type')
+    if expected:
+        types = expected if isinstance(expected, list) else [expected]
+        matched = any(
+            isinstance(value, _JSON_TYPES[t]) and not (t in ('number', 'integer') and isinstance(value, bool))
+            for t in types
+        )
+        if not matched:
+            return [f"{path}: expected {'/'.join(types)}, got {type(value).__name__}"]
+    
+    if isinstance(value, dict):
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append(f"{path}.{key}: missing required field")
+        for key, sub_schema in schema.get('properties', {}).items():
+            if key in value:
+                errors.extend(validate_schema(value[key], sub_schema, f"{path}.{key}"))
+    elif isinstance(value, list) and 'items' in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate_schema(item, schema['items'], f"{path}[{i}]"))
+    
+    return errors
+
+def repair_json(content):
+    """Best-effort local repair of truncated or wrapped JSON output.
+    
+    Slices from the first '{', then closes any open strings, arrays and
+    objects. If that still doesn't parse, backs off to the last complete
+    element and closes from there. Returns None when nothing parses.
+    """
+    start = content.find('{')
+    if start == -1:
+        return None
+    text = content[start:]
+    
+    end = text.rfind('}') + 1
+    if end:
         try:
-            response = self.bedrock.invoke_model(
-                modelId='anthropic.claude-3-haiku-20240307-v1:0',
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 2000,
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-            )
+            return json.loads(text[:end])
+        except json.JSONDecodeError:
+            pass
+    
+    stack = []
+    cut_points = []  # (index, stack snapshot) after each complete element
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]':
+            if stack:
+                stack.pop()
+            if not stack:
+                text = text[:i + 1]
+                break
+            cut_points.append((i + 1, list(stack)))
+        elif ch == ',':
+            cut_points.append((i, list(stack)))
+    
+    candidates = []
+    tail = text + ('"' if in_string else '')
+    candidates.append(tail.rstrip().rstrip(',:') + ''.join(reversed(stack)))
+    for index, snapshot in reversed(cut_points[-20:]):
+        candidates.append(text[:index].rstrip().rstrip(',') + ''.join(reversed(snapshot)))
+    
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+# Errors that say the upstream itself is unhealthy. Anything else (e.g. a
+# ValidationException for an oversized prompt) is specific to one request
+# and must not open the shared breaker or shrink the concurrency limit.
+UPSTREAM_ERROR_CODES = {
+    'ThrottlingException',
+    'ServiceUnavailableException',
+    'ModelTimeoutException',
+    'ModelNotReadyException',
+    'InternalServerException'
+}
+
+def is_upstream_failure(error):
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return code in UPSTREAM_ERROR_CODES or status >= 500
+    return isinstance(error, (ConnectTimeoutError, ReadTimeoutError, EndpointConnectionError, ConnectionClosedError))
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker around the upstream LLM.
+    
+    Opens after failure_threshold consecutive failures, stays open for
+    reset_timeout seconds, then lets a limited number of half-open probes
+    through. A successful probe closes it, a failed one reopens it.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, half_open_probes=1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0
+        self.probes_in_flight = 0
+    
+    def allow(self):
+        with self.lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = 'half_open'
+                self.probes_in_flight = 0
+            if self.state == 'half_open':
+                if self.probes_in_flight >= self.half_open_probes:
+                    return False
+                self.probes_in_flight += 1
+            return True
+    
+    def cancel(self):
+        """Give back a half-open probe slot that was allowed but never used"""
+        with self.lock:
+            if self.state == 'half_open' and self.probes_in_flight > 0:
+                self.probes_in_flight -= 1
+    
+    def record_success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.probes_in_flight = 0
+    
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.probes_in_flight = 0
+    
+    def snapshot(self):
+        with self.lock:
+            return {'state': self.state, 'consecutive_failures': self.failures}
+
+class AdmissionController:
+    """Concurrency limit with a bounded wait queue for one call type.
+    
+    Callers that can't get a slot within queue_timeout (or find the queue
+    full) are rejected so they can serve a fallback instead of waiting on
+    a slow upstream; offline callers pass block=True to wait for a slot
+    with no deadline instead. The limit adapts AIMD-style: it grows slowly while
+    calls finish under latency_target and halves on slow or failed calls.
+    """
+    def __init__(self, max_concurrency=4, max_queue=16, queue_timeout=2.0, latency_target=10.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_target = latency_target
+        self.cond = threading.Condition()
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+    
+    def acquire(self, block=False):
+        with self.cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            if not block and self.waiting >= self.max_queue:
+                return False
             
+            deadline = time.monotonic() + self.queue_timeout
+            self.waiting += 1
+            try:
+                while self.in_flight >= int(self.limit):
+                    if block:
+                        self.cond.wait()
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self.cond.wait(remaining)
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+    
+    def release(self, latency, ok):
+        with self.cond:
+            self.in_flight -= 1
+            if ok and latency <= self.latency_target:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            else:
+                self.limit = max(1.0, self.limit / 2)
+            self.cond.notify_all()
+    
+    def snapshot(self):
+        with self.cond:
+            return {'limit': int(self.limit), 'in_flight': self.in_flight, 'waiting': self.waiting}
+
+class LLMGateway:
+    """Shared Bedrock client that returns schema-validated JSON.
+    
+    Keeps counters for failed parses, repairs, fallbacks and wasted output
+    tokens so parse quality can be measured (pass a stub client in tests).
+    Calls go through a circuit breaker and a per-call-type admission
+    controller; when either refuses, None is returned immediately so the
+    caller serves its local fallback. A blocking gateway (for offline
+    batch work) waits for an admission slot instead of degrading.
+    """
+    def __init__(self, client=None, blocking=False):
+        self.bedrock = client or boto3.client(
+            'bedrock-runtime',
+            region_name='us-east-1',
+            config=Config(
+                connect_timeout=float(os.getenv('LLM_CONNECT_TIMEOUT', '3')),
+                read_timeout=float(os.getenv('LLM_READ_TIMEOUT', '20')),
+                retries={'max_attempts': 2, 'mode': 'standard'}
+            )
+        )
+        self.blocking = blocking
+        self.routes = load_llm_routes()
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+        )
+        self.admission = {
+            call_type: AdmissionController(
+                max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '4')),
+                max_queue=int(os.getenv('LLM_MAX_QUEUE', '16')),
+                queue_timeout=float(os.getenv('LLM_QUEUE_TIMEOUT', '2')),
+                latency_target=float(os.getenv('LLM_LATENCY_TARGET', '10'))
+            )
+            for call_type in self.routes
+        }
+        self.prompt_caching = os.getenv('LLM_PROMPT_CACHING', 'False').lower() == 'true'
+        self.lock = threading.Lock()
+        self.stats = {}
+    
+    def _count(self, call_type, key, amount=1):
+        with self.lock:
+            bucket = self.stats.setdefault(call_type, {
+                'calls': 0,
+                'parse_failures': 0,
+                'local_repairs': 0,
+                'llm_repairs': 0,
+                'fallbacks': 0,
+                'client_errors': 0,
+                'truncations': 0,
+                'short_circuited': 0,
+                'rejected': 0,
+                'output_tokens': 0,
+                'wasted_output_tokens': 0
+            })
+            bucket[key] += amount
+    
+    def get_stats(self):
+        with self.lock:
+            stats = {call_type: dict(bucket) for call_type, bucket in self.stats.items()}
+        for bucket in stats.values():
+            bucket['failed_parse_rate'] = bucket['parse_failures'] / bucket['calls'] if bucket['calls'] else 0
+        return stats
+    
+    def get_health(self):
+        return {
+            'circuit_breaker': self.breaker.snapshot(),
+            'admission': {call_type: controller.snapshot() for call_type, controller in self.admission.items()}
+        }
+    
+    def _build_content(self, prompt_prefix, prompt_suffix):
+        prefix_block = {"type": "text", "text": prompt_prefix}
+        if self.prompt_caching:
+            prefix_block["cache_control"] = {"type": "ephemeral"}
+        return [prefix_block, {"type": "text", "text": prompt_suffix}]
+    
+    def _invoke(self, call_type, prompt_prefix, prompt_suffix, spec, max_tokens=None):
+        route = self.routes[call_type]
+        try:
+            with tracer.span('llm.invoke', call_type=call_type, model_id=route['model_id']):
+                response = self.bedrock.invoke_model(
+                    modelId=route['model_id'],
+                    body=json.dumps({
+                        "anthropic_version": "bedrock-2023-05-31",
+                        "max_tokens": max_tokens or route['max_tokens'],
+                        "temperature": route['temperature'],
+                        "tools": [{
+                            "name": spec['tool_name'],
+                            "description": spec['description'],
+                            "input_schema": spec['schema']
+                        }],
+                        "tool_choice": {"type": "tool", "name": spec['tool_name']},
+                        "messages": [{"role": "user", "content": self._build_content(prompt_prefix, prompt_suffix)}]
+                    })
+                )
+        except Exception as e:
+            if is_upstream_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.cancel()
+            raise
+        self.breaker.record_success()
+        
+        with tracer.span('llm.read_body'):
             result = json.loads(response['body'].read())
-            content = result['content'][0]['text']
-            
-            # Extract JSON from response
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end != 0:
-                return json.loads(content[start:end])
-            
-        except (ClientError, json.JSONDecodeError, KeyError):
-            pass
+        output_tokens = result.get('usage', {}).get('output_tokens', 0)
+        self._count(call_type, 'output_tokens', output_tokens)
+        
+        data = None
+        text = ""
+        for block in result.get('content', []):
+            if block.get('type') == 'tool_use' and block.get('name') == spec['tool_name']:
+                data = block.get('input')
+            elif block.get('type') == 'text':
+                text += block.get('text', '')
+        
+        truncated = result.get('stop_reason') == 'max_tokens'
+        if truncated:
+            self._count(call_type, 'truncations')
+        return data, text, output_tokens, truncated
+    
+    def invoke_structured(self, call_type, prompt_prefix, prompt_suffix):
+        """Run a structured call; returns a dict or None on failure.
+        
+        prompt_prefix should be static text so it can be cached; everything
+        request-specific belongs in prompt_suffix. None is also returned
+        straight away when the breaker is open or no slot frees up in time.
+        """
+        spec = STRUCTURED_OUTPUTS[call_type]
+        self._count(call_type, 'calls')
+        
+        if not self.breaker.allow():
+            self._count(call_type, 'short_circuited')
+            self._count(call_type, 'fallbacks')
+            return None
+        
+        admission = self.admission[call_type]
+        if not admission.acquire(block=self.blocking):
+            self.breaker.cancel()
+            self._count(call_type, 'rejected')
+            self._count(call_type, 'fallbacks')
+            return None
+        
+        started = time.monotonic()
+        upstream_ok = False
+        try:
+            with tracer.span(f'llm.{call_type}'):
+                result, upstream_ok = self._run_structured(call_type, prompt_prefix, prompt_suffix, spec)
+            return result
+        finally:
+            admission.release(time.monotonic() - started, upstream_ok)
+    
+    def _run_structured(self, call_type, prompt_prefix, prompt_suffix, spec):
+        try:
+            data, raw, spent, truncated = self._invoke(call_type, prompt_prefix, prompt_suffix, spec)
+        except (ClientError, BotoCoreError, json.JSONDecodeError, KeyError) as e:
+            self._count(call_type, 'client_errors')
+            self._count(call_type, 'fallbacks')
+            return None, not is_upstream_failure(e)
+        
+        with tracer.span('llm.json_extract'):
+            errors = validate_schema(data, spec['schema']) if data is not None else ['$: no tool output in response']
+        if not errors:
+            return data, True
+        
+        self._count(call_type, 'parse_failures')
+        
+        # Cheap local repair of truncated or wrapped JSON in the text output
+        if isinstance(data, str):
+            raw = data
+        if raw:
+            with tracer.span('llm.local_repair'):
+                repaired = repair_json(raw)
+            if repaired is not None and not validate_schema(repaired, spec['schema']):
+                self._count(call_type, 'local_repairs')
+                return repaired, True
+        
+        # One LLM repair pass with the validation errors. A truncated first
+        # attempt would truncate again on the same budget, so double it.
+        route_tokens = self.routes[call_type]['max_tokens']
+        repair_tokens = min(route_tokens * 2, MAX_REPAIR_TOKENS) if truncated else route_tokens
+        broken = raw if raw else json.dumps(data)
+        repair_suffix = f"""Validation errors:
+{json.dumps(errors[:10])}
+
+Output:
+{broken[:4000]}"""
+        try:
+            repaired, _, repair_spent, _ = self._invoke(call_type, REPAIR_PREFIX, repair_suffix, spec, repair_tokens)
+            if repaired is not None and not validate_schema(repaired, spec['schema']):
+                # The first generation was thrown away even though we recovered
+                self._count(call_type, 'llm_repairs')
+                self._count(call_type, 'wasted_output_tokens', spent)
+                return repaired, True
+            spent += repair_spent
+        except (ClientError, BotoCoreError, json.JSONDecodeError, KeyError):
+            self._count(call_type, 'client_errors')
+        
+        self._count(call_type, 'fallbacks')
+        self._count(call_type, 'wasted_output_tokens', spent)
+        return None, True
+
+llm_gateway = LLMGateway()
+
+class ResumeParser:
+    def __init__(self, gateway=None):
+        self.gateway = gateway or llm_gateway
+        
+    def extract_text_from_pdf(self, file_path):
+        text = ""
+        with tracer.span('extract.pdfplumber'):
+            with pdfplumber.open(file_path) as pdf:
+                for page in pdf.pages:
+                    text += page.extract_text() or ""
+        return text
+    
+    def extract_text_from_docx(self, file_path):
+        with tracer.span('extract.docx'):
+            doc = Document(file_path)
+            return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+    
+    def parse_with_llm(self, text):
+        result = self.gateway.invoke_structured('parse', RESUME_PARSE_PREFIX, text)
+        if result is not None:
+            return result
         
-        # Fallback to basic parsing if LLM fails
-        return self.basic_parse(text)
+        # Fallback to basic parsing if LLM fails or is unavailable
+        parsed = self.basic_parse(text)
+        parsed["degraded"] = True
+        return parsed
     
     def basic_parse(self, text):
         import re
@@ -147,23 +1003,21 @@ Return ONLY the JSON object:"""
         return parsed_data
 
 class SessionContextManager:
-    def __init__(self):
-        self.profiles_file = 'user_profiles.json'
-        self.load_profiles()
-    
-    def load_profiles(self):
-        try:
-            with open(self.profiles_file, 'r') as f:
-                self.profiles = json.load(f)
-        except FileNotFoundError:
-            self.profiles = {}
+    def __init__(self, profile_store=None):
+        # Read through the live profile store so new sessions and rollups are
+        # visible before write-behind flushes them to disk
+        self.profile_store = profile_store
     
     def get_user_context(self, user_email):
         """Get user's learning context and history"""
-        if user_email not in self.profiles:
+        profile_store = self.profile_store or get_profile_store()
+        if user_email not in profile_store.profiles:
             return None
         
-        profile = self.profiles[user_email]
+        with tracer.span('profile.context'), profile_store._user_lock(user_email):
+            return self._build_user_context(profile_store.profiles[user_email])
+    
+    def _build_user_context(self, profile):
         sessions = profile.get('sessions', [])
         
         if not sessions:
@@ -175,117 +1029,61 @@ class SessionContextManager:
         improvement_trend = 'stable'
         
         # Extract weak areas from recent analysis
+        # Stored sessions may predate validation of the request body
         for session in recent_sessions:
-            analysis = session.get('analysis', {})
-            for q_analysis in analysis.values():
-                if q_analysis.get('score', 0) < 60:
-                    weak_areas.extend(q_analysis.get('improvements', []))
+            analysis = session.get('analysis')
+            for q_analysis in (analysis.values() if isinstance(analysis, dict) else []):
+                if not isinstance(q_analysis, dict):
+                    continue
+                score = q_analysis.get('score', 0)
+                improvements = q_analysis.get('improvements', [])
+                if isinstance(score, (int, float)) and score < 60 and isinstance(improvements, list):
+                    weak_areas.extend(area for area in improvements if isinstance(area, str))
+        
+        # Then the most recurring weak areas from rolled-up history
+        rollup_areas = {}
+        for rollup in profile.get('session_rollups', {}).values():
+            for area, count in rollup.get('weak_areas', {}).items():
+                rollup_areas[area] = rollup_areas.get(area, 0) + count
+        weak_areas.extend(sorted(rollup_areas, key=rollup_areas.get, reverse=True))
         
         # Calculate improvement trend
         if len(recent_sessions) >= 2:
-            recent_avg = sum(s.get('avg_score', 0) for s in recent_sessions[-2:]) / 2
-            older_avg = sum(s.get('avg_score', 0) for s in recent_sessions[:-2]) / max(1, len(recent_sessions) - 2)
+            scores = [UserProfile._number(s.get('avg_score')) for s in recent_sessions]
+            recent_avg = sum(scores[-2:]) / 2
+            older_avg = sum(scores[:-2]) / max(1, len(scores) - 2)
             if recent_avg > older_avg + 5:
                 improvement_trend = 'improving'
             elif recent_avg < older_avg - 5:
                 improvement_trend = 'declining'
         
         return {
-            'weak_areas': list(set(weak_areas))[:5],  # Top 5 unique weak areas
+            'weak_areas': list(dict.fromkeys(weak_areas))[:5],  # Top 5 unique weak areas
             'improvement_trend': improvement_trend,
-            'session_count': len(sessions),
+            'session_count': profile.get('performance_metrics', {}).get('total_sessions', len(sessions)),
             'avg_score': profile.get('performance_metrics', {}).get('avg_score', 0)
         }
 
 class QuestionGenerator:
-    def __init__(self):
-        self.bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+    def __init__(self, gateway=None):
+        self.gateway = gateway or llm_gateway
         self.context_manager = SessionContextManager()
     
     def generate_interview_questions(self, resume_data):
-        prompt = f"""Based on this resume data, generate 10 relevant interview questions in JSON format.
-Include technical, behavioral, and experience-based questions.
-
-Resume data:
-{json.dumps(resume_data, indent=2)}
-
-Return JSON with this structure:
-{{
-  "questions": [
-    {{"type": "technical", "question": "..."}},
-    {{"type": "behavioral", "question": "..."}},
-    {{"type": "experience", "question": "..."}}
-  ]
-}}
-
-Return only valid JSON:"""
-        
-        try:
-            response = self.bedrock.invoke_model(
-                modelId='anthropic.claude-3-haiku-20240307-v1:0',
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 2000,
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-            )
-            
-            result = json.loads(response['body'].read())
-            content = result['content'][0]['text']
-            
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end != 0:
-                return json.loads(content[start:end])
-            
-        except (ClientError, json.JSONDecodeError, KeyError):
-            pass
+        result = self.gateway.invoke_structured('questions', QUESTIONS_PREFIX, json.dumps(resume_data, indent=2))
+        if result is not None:
+            return result
         
-        return {"questions": [{"type": "general", "question": "Tell me about yourself."}]}
+        return {"questions": [{"type": "general", "question": "Tell me about yourself."}], "degraded": True}
 
 class ATSAnalyzer:
-    def __init__(self):
-        self.bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+    def __init__(self, gateway=None):
+        self.gateway = gateway or llm_gateway
     
     def analyze_ats_score(self, resume_data):
-        prompt = f"""Analyze this resume for ATS compatibility and suggest specific job roles. Return JSON format:
-
-Resume data:
-{json.dumps(resume_data, indent=2)}
-
-Return JSON with this structure:
-{{
-  "ats_score": 85,
-  "suggested_roles": ["Senior Software Engineer", "Full Stack Developer", "Backend Engineer"],
-  "best_role": "Senior Software Engineer",
-  "strengths": ["keyword1", "keyword2"],
-  "improvements": ["suggestion1", "suggestion2"],
-  "keyword_density": 75,
-  "format_score": 90
-}}
-
-Return only valid JSON:"""
-        
-        try:
-            response = self.bedrock.invoke_model(
-                modelId='anthropic.claude-3-haiku-20240307-v1:0',
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 1500,
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-            )
-            
-            result = json.loads(response['body'].read())
-            content = result['content'][0]['text']
-            
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end != 0:
-                return json.loads(content[start:end])
-            
-        except (ClientError, json.JSONDecodeError, KeyError):
-            pass
+        result = self.gateway.invoke_structured('ats', ATS_PREFIX, json.dumps(resume_data, indent=2))
+        if result is not None:
+            return result
         
         return {
             "ats_score": 70,
@@ -294,12 +1092,13 @@ Return only valid JSON:"""
             "strengths": ["Experience listed"],
             "improvements": ["Add more keywords"],
             "keyword_density": 60,
-            "format_score": 80
+            "format_score": 80,
+            "degraded": True
         }
 
 class AnswerAnalyzer:
-    def __init__(self):
-        self.bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+    def __init__(self, gateway=None):
+        self.gateway = gateway or llm_gateway
         self.context_manager = SessionContextManager()
     
     def analyze_answer(self, question, answer, question_type, user_email=None):
@@ -308,87 +1107,91 @@ class AnswerAnalyzer:
         if user_email:
             user_context = self.context_manager.get_user_context(user_email)
         
-        if user_context:
-            prompt = f"""Analyze this interview answer considering the user's learning journey:
-
-Question: {question}
+        prompt_suffix = f"""Question: {question}
 Question Type: {question_type}
-Answer: {answer}
+Answer: {answer}"""
+        
+        if user_context:
+            prompt_prefix = ANSWER_CONTEXT_PREFIX
+            prompt_suffix += f"""
 
 User Learning Context:
 - Previous weak areas: {user_context.get('weak_areas', [])}
 - Improvement trend: {user_context.get('improvement_trend', 'stable')}
 - Average score: {user_context.get('avg_score', 0)}%
-- Session count: {user_context.get('session_count', 0)}
-
-Provide personalized feedback that:
-1. Acknowledges their progress if improving
-2. Addresses recurring weak areas specifically
-3. Adjusts expectations based on their skill level
-4. Provides targeted next steps for improvement
-
-Return JSON with this structure:
-{{
-  "score": 85,
-  "feedback": "Personalized feedback based on learning journey...",
-  "strengths": ["Clear communication", "Relevant experience"],
-  "improvements": ["Targeted suggestions based on history"],
-  "overall_rating": "Good",
-  "progress_note": "Improvement/decline note based on trend"
-}}
-
-Return only valid JSON:"""
+- Session count: {user_context.get('session_count', 0)}"""
         else:
-            prompt = f"""Analyze this interview answer and provide scoring with feedback. Return JSON format:
-
-Question: {question}
-Question Type: {question_type}
-Answer: {answer}
-
-Return JSON with this structure:
-{{
-  "score": 85,
-  "feedback": "Good answer with specific examples...",
-  "strengths": ["Clear communication", "Relevant experience"],
-  "improvements": ["Add more technical details", "Include metrics"],
-  "overall_rating": "Good"
-}}
-
-Return only valid JSON:"""
+            prompt_prefix = ANSWER_PREFIX
         
-        try:
-            response = self.bedrock.invoke_model(
-                modelId='anthropic.claude-3-haiku-20240307-v1:0',
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 1500,
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-            )
-            
-            result = json.loads(response['body'].read())
-            content = result['content'][0]['text']
-            
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end != 0:
-                return json.loads(content[start:end])
-            
-        except (ClientError, json.JSONDecodeError, KeyError):
-            pass
+        result = self.gateway.invoke_structured('answer', prompt_prefix, prompt_suffix)
+        if result is not None:
+            return result
         
         return {
             "score": 70,
             "feedback": "Please provide more details in your answer.",
             "strengths": ["Answer provided"],
             "improvements": ["Add specific examples"],
-            "overall_rating": "Average"
+            "overall_rating": "Average",
+            "degraded": True
         }
 
 class UserProfile:
-    def __init__(self):
+    """Profile store backed by user_profiles.json.
+    
+    In write-behind mode (PROFILE_WRITE_BEHIND, on by default) a session
+    record is validated and applied in memory under a per-user lock, then
+    appended to a local log. Appends are group-committed: whichever
+    waiting request finds no fsync in progress syncs everything written
+    so far, and the others return once their record is covered. A
+    background thread rewrites the main store in batches once
+    PROFILE_FLUSH_BATCH records are pending or PROFILE_FLUSH_INTERVAL
+    seconds have passed. On startup any log left by a crash is replayed.
+    Records carry a store-wide sequence number and each profile keeps the
+    last one applied to it ('log_seq'), so replay skips records the store
+    already holds even after compaction rolled their sessions up; a
+    record that fails to apply is moved to user_profiles.json.log.rejected.
+    
+    Only the newest PROFILE_KEEP_SESSIONS sessions are kept in full; older
+    ones are rolled into per-month summaries in 'session_rollups', and
+    ats_history is capped at PROFILE_MAX_ATS_HISTORY. A background thread
+    compacts profiles every PROFILE_COMPACT_INTERVAL seconds (inline on
+    record in synchronous mode).
+    """
+    def __init__(self, write_behind=None):
         self.profiles_file = 'user_profiles.json'
+        self.log_file = self.profiles_file + '.log'
+        self.flushing_file = self.log_file + '.flushing'
+        self.rejected_file = self.log_file + '.rejected'
+        if write_behind is None:
+            write_behind = os.getenv('PROFILE_WRITE_BEHIND', 'True').lower() == 'true'
+        self.write_behind = write_behind
+        self.flush_batch = int(os.getenv('PROFILE_FLUSH_BATCH', '20'))
+        self.flush_interval = float(os.getenv('PROFILE_FLUSH_INTERVAL', '5'))
+        self.keep_sessions = int(os.getenv('PROFILE_KEEP_SESSIONS', '20'))
+        self.max_ats_history = int(os.getenv('PROFILE_MAX_ATS_HISTORY', '10'))
+        self.compact_interval = float(os.getenv('PROFILE_COMPACT_INTERVAL', '300'))
+        self.lock = threading.Lock()
+        self.user_locks = {}
+        self.log_lock = threading.Lock()
+        self.log_cond = threading.Condition(self.log_lock)
+        self.written_seq = 0
+        self.durable_seq = 0
+        self.syncing = False
+        self.flush_lock = threading.Lock()
+        self.pending = 0
+        self.dirty = False
+        self.flush_event = threading.Event()
         self.load_profiles()
+        
+        if self.write_behind:
+            self._recover()
+            self.log = open(self.log_file, 'a')
+            self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self.flusher.start()
+            self.compactor = threading.Thread(target=self._compact_loop, daemon=True)
+            self.compactor.start()
+            atexit.register(self.flush)
     
     def load_profiles(self):
         try:
@@ -396,12 +1199,121 @@ class UserProfile:
                 self.profiles = json.load(f)
         except FileNotFoundError:
             self.profiles = {}
+        
+        # Sessions recorded before ids existed need one for pagination cursors
+        for profile in self.profiles.values():
+            for session in profile.get('sessions', []):
+                session.setdefault('id', uuid.uuid4().hex)
+        self.record_seq = max((p.get('log_seq', 0) for p in self.profiles.values()), default=0)
     
     def save_profiles(self):
-        with open(self.profiles_file, 'w') as f:
-            json.dump(self.profiles, f, indent=2)
+        snapshot = {}
+        for user_email in list(self.profiles):
+            with self._user_lock(user_email):
+                snapshot[user_email] = json.loads(json.dumps(self.profiles[user_email]))
+        
+        tmp_file = f"{self.profiles_file}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp_file, self.profiles_file)
+    
+    def _user_lock(self, user_email):
+        with self.lock:
+            if user_email not in self.user_locks:
+                self.user_locks[user_email] = threading.Lock()
+            return self.user_locks[user_email]
     
     def record_session(self, user_email, session_data):
+        record = {
+            'id': uuid.uuid4().hex,
+            'user_email': user_email,
+            'session_data': session_data
+        }
+        
+        with self._user_lock(user_email):
+            # Numbered under the user lock so a user's records are applied
+            # and logged in sequence order
+            with self.lock:
+                self.record_seq += 1
+                record['seq'] = self.record_seq
+            # Apply before logging so a record that can't be applied (it
+            # raises ValueError) never reaches the log
+            self._apply_record(record)
+            if self.write_behind:
+                with tracer.span('profile.log_append'), self.log_cond:
+                    self.log.write(json.dumps(record) + '\n')
+                    self.written_seq += 1
+                    seq = self.written_seq
+                    self.pending += 1
+                    if self.pending >= self.flush_batch:
+                        self.flush_event.set()
+            else:
+                self._compact_user(user_email)
+        
+        if self.write_behind:
+            with tracer.span('profile.group_commit'):
+                self._wait_durable(seq)
+        else:
+            with tracer.span('profile.save'), self.flush_lock:
+                self.save_profiles()
+    
+    def _wait_durable(self, seq):
+        """Block until log record seq is fsynced, leading a group commit if nobody is"""
+        with self.log_cond:
+            while self.durable_seq < seq:
+                if self.syncing:
+                    self.log_cond.wait()
+                    continue
+                
+                self.syncing = True
+                target = self.written_seq
+                self.log.flush()
+                fd = self.log.fileno()
+                synced = False
+                self.log_cond.release()
+                try:
+                    os.fsync(fd)
+                    synced = True
+                finally:
+                    self.log_cond.acquire()
+                    self.syncing = False
+                    if synced:
+                        self.durable_seq = max(self.durable_seq, target)
+                    self.log_cond.notify_all()
+    
+    def _normalize_session(self, session_data):
+        """Validate a session from the request body before it touches a profile"""
+        if not isinstance(session_data, dict):
+            raise ValueError("session data must be an object")
+        session_data = dict(session_data)
+        for key in ('avg_score', 'completion_rate'):
+            value = session_data.get(key)
+            if value is None:
+                session_data[key] = 0
+            elif isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(f"{key} must be a number")
+        if session_data.get('ats_data') is not None and not isinstance(session_data['ats_data'], dict):
+            raise ValueError("ats_data must be an object")
+        analysis = session_data.get('analysis')
+        if analysis is None:
+            session_data['analysis'] = {}
+        elif not isinstance(analysis, dict):
+            raise ValueError("analysis must be an object")
+        else:
+            for q_analysis in analysis.values():
+                if not isinstance(q_analysis, dict):
+                    raise ValueError("analysis entries must be objects")
+                score = q_analysis.get('score', 0)
+                if isinstance(score, bool) or not isinstance(score, (int, float)):
+                    raise ValueError("analysis scores must be numbers")
+                if not isinstance(q_analysis.get('improvements', []), list):
+                    raise ValueError("analysis improvements must be a list")
+        return session_data
+    
+    def _apply_record(self, record):
+        user_email = record['user_email']
+        session_data = self._normalize_session(record['session_data'])
+        
         if user_email not in self.profiles:
             self.profiles[user_email] = {
                 'sessions': [],
@@ -416,41 +1328,147 @@ class UserProfile:
         
         # Record session with avg_score
         session_entry = {
+            'id': record['id'],
             'timestamp': session_data.get('timestamp'),
             'answers': session_data.get('answers', {}),
             'scores': session_data.get('scores', {}),
+            'analysis': session_data.get('analysis', {}),
             'completion_rate': session_data.get('completion_rate', 0),
             'avg_score': session_data.get('avg_score', 0)
         }
         self.profiles[user_email]['sessions'].append(session_entry)
         
         # Record ATS data if provided
-        if 'ats_data' in session_data:
+        if session_data.get('ats_data') is not None:
             self.profiles[user_email]['ats_history'].append(session_data['ats_data'])
         
         # Update performance metrics
         self._update_metrics(user_email)
-        self.save_profiles()
+        if 'seq' in record:
+            self.profiles[user_email]['log_seq'] = record['seq']
+        self._bump_version(user_email)
+    
+    def _bump_version(self, user_email):
+        profile = self.profiles[user_email]
+        profile['version'] = profile.get('version', 0) + 1
+    
+    def _recover(self):
+        """Replay session records left in the log by an unclean shutdown"""
+        seen = set()
+        for profile in self.profiles.values():
+            seen.update(s['id'] for s in profile.get('sessions', []) if 'id' in s)
+        
+        replayed = 0
+        skipped = 0
+        for path in (self.flushing_file, self.log_file):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn final write from the crash
+                        continue
+                    if not isinstance(record, dict) or record.get('id') in seen:
+                        continue
+                    seq = record.get('seq')
+                    if isinstance(seq, int):
+                        self.record_seq = max(self.record_seq, seq)
+                        profile = self.profiles.get(record.get('user_email'), {})
+                        if seq <= profile.get('log_seq', 0):
+                            # Already in the store, possibly rolled up
+                            continue
+                    try:
+                        with self._user_lock(record['user_email']):
+                            self._apply_record(record)
+                    except Exception as e:
+                        # Keep the record for inspection rather than fail startup
+                        print(f"Skipping unreplayable session record: {e}")
+                        with open(self.rejected_file, 'a') as rejected:
+                            rejected.write(line.rstrip('\n') + '\n')
+                        skipped += 1
+                        continue
+                    seen.add(record['id'])
+                    replayed += 1
+        
+        if skipped:
+            print(f"Moved {skipped} session records to {self.rejected_file}")
+        if replayed:
+            print(f"Replayed {replayed} session records from {self.log_file}")
+            self.save_profiles()
+        for path in (self.flushing_file, self.log_file):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def _flush_loop(self):
+        while True:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Profile flush failed: {e}")
+    
+    def flush(self):
+        """Write pending records to the main store and retire their log"""
+        if not self.write_behind:
+            return
+        
+        with self.flush_lock:
+            with self.log_cond:
+                if not self.pending and not self.dirty:
+                    return
+                # Let an in-flight group commit finish, then make the rest durable
+                while self.syncing:
+                    self.log_cond.wait()
+                self.log.flush()
+                os.fsync(self.log.fileno())
+                self.durable_seq = self.written_seq
+                self.log_cond.notify_all()
+                self.log.close()
+                if os.path.exists(self.flushing_file):
+                    # A previous flush failed; keep its records ahead of ours
+                    with open(self.flushing_file, 'a') as dst, open(self.log_file, 'r') as src:
+                        dst.write(src.read())
+                    os.remove(self.log_file)
+                else:
+                    os.replace(self.log_file, self.flushing_file)
+                self.log = open(self.log_file, 'a')
+                self.pending = 0
+                self.dirty = False
+            
+            self.save_profiles()
+            os.remove(self.flushing_file)
+    
+    @staticmethod
+    def _number(value):
+        # Sessions saved before validation may hold null or non-numeric scores
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
     
     def _update_metrics(self, user_email):
         profile = self.profiles[user_email]
         sessions = profile['sessions']
+        rollups = profile.get('session_rollups', {}).values()
         
-        if sessions:
-            # Calculate average interview score from sessions with avg_score
-            sessions_with_scores = [s for s in sessions if s.get('avg_score', 0) > 0]
-            if sessions_with_scores:
-                total_score = sum(s.get('avg_score', 0) for s in sessions_with_scores)
-                profile['performance_metrics']['avg_score'] = total_score / len(sessions_with_scores)
+        if sessions or rollups:
+            # Calculate average interview score from sessions with avg_score,
+            # including sessions already folded into rollups
+            sessions_with_scores = [s for s in sessions if self._number(s.get('avg_score')) > 0]
+            scored_count = len(sessions_with_scores) + sum(r['scored_count'] for r in rollups)
+            total_count = len(sessions) + sum(r['count'] for r in rollups)
+            if scored_count:
+                total_score = sum(s['avg_score'] for s in sessions_with_scores) + sum(r['score_sum'] for r in rollups)
+                profile['performance_metrics']['avg_score'] = total_score / scored_count
             else:
                 # Fallback to completion rate if no interview scores
-                if len(sessions) > 0:
-                    total_completion = sum(s.get('completion_rate', 0) for s in sessions)
-                    profile['performance_metrics']['avg_score'] = total_completion / len(sessions)
+                if total_count > 0:
+                    total_completion = sum(self._number(s.get('completion_rate')) for s in sessions) + sum(r['completion_sum'] for r in rollups)
+                    profile['performance_metrics']['avg_score'] = total_completion / total_count
                 else:
                     profile['performance_metrics']['avg_score'] = 0
             
-            profile['performance_metrics']['total_sessions'] = len(sessions)
+            profile['performance_metrics']['total_sessions'] = total_count
             
             # Extract preferred roles from ATS history
             if profile['ats_history']:
@@ -458,9 +1476,183 @@ class UserProfile:
                 profile['performance_metrics']['preferred_roles'] = latest_ats.get('suggested_roles', [])
                 profile['performance_metrics']['skill_strengths'] = latest_ats.get('strengths', [])
     
+    def _compact_user(self, user_email):
+        """Roll sessions beyond the newest keep_sessions into per-month summaries.
+        
+        Returns True if the profile changed. Caller must hold the user lock.
+        """
+        profile = self.profiles[user_email]
+        sessions = profile['sessions']
+        changed = False
+        
+        if len(sessions) > self.keep_sessions:
+            old_sessions = sessions[:len(sessions) - self.keep_sessions]
+            # Build on a copy so a failure can't leave rollups updated for
+            # sessions that were never trimmed
+            rollups = json.loads(json.dumps(profile.get('session_rollups', {})))
+            for session in old_sessions:
+                # Timestamps come straight from the request body
+                timestamp = session.get('timestamp')
+                if isinstance(timestamp, str) and len(timestamp) >= 7 and timestamp[4] == '-':
+                    period = timestamp[:7]
+                else:
+                    period = 'unknown'
+                rollup = rollups.setdefault(period, {
+                    'count': 0,
+                    'scored_count': 0,
+                    'score_sum': 0,
+                    'score_min': None,
+                    'score_max': None,
+                    'avg_score': 0,
+                    'completion_sum': 0,
+                    'weak_areas': {},
+                    'first_timestamp': session.get('timestamp'),
+                    'last_timestamp': session.get('timestamp')
+                })
+                rollup['count'] += 1
+                completion = session.get('completion_rate', 0)
+                if isinstance(completion, (int, float)):
+                    rollup['completion_sum'] += completion
+                rollup['last_timestamp'] = session.get('timestamp') or rollup['last_timestamp']
+                
+                score = session.get('avg_score', 0)
+                if isinstance(score, (int, float)) and score > 0:
+                    rollup['scored_count'] += 1
+                    rollup['score_sum'] += score
+                    rollup['score_min'] = score if rollup['score_min'] is None else min(rollup['score_min'], score)
+                    rollup['score_max'] = score if rollup['score_max'] is None else max(rollup['score_max'], score)
+                    rollup['avg_score'] = rollup['score_sum'] / rollup['scored_count']
+                
+                analysis = session.get('analysis')
+                for q_analysis in (analysis.values() if isinstance(analysis, dict) else []):
+                    if not isinstance(q_analysis, dict):
+                        continue
+                    score = q_analysis.get('score', 0)
+                    if isinstance(score, (int, float)) and score < 60:
+                        for area in q_analysis.get('improvements', []):
+                            if isinstance(area, str):
+                                rollup['weak_areas'][area] = rollup['weak_areas'].get(area, 0) + 1
+                
+                # Keep only the most recurring weak areas per period
+                if len(rollup['weak_areas']) > 20:
+                    top = sorted(rollup['weak_areas'].items(), key=lambda item: item[1], reverse=True)[:10]
+                    rollup['weak_areas'] = dict(top)
+            
+            profile['session_rollups'] = rollups
+            profile['sessions'] = sessions[len(old_sessions):]
+            changed = True
+        
+        if len(profile['ats_history']) > self.max_ats_history:
+            profile['ats_history'] = profile['ats_history'][-self.max_ats_history:]
+            changed = True
+        
+        if changed:
+            self._update_metrics(user_email)
+            self._bump_version(user_email)
+        return changed
+    
+    def compact(self):
+        """Compact every profile over the retention limits; returns users compacted"""
+        compacted = []
+        for user_email in list(self.profiles):
+            with self._user_lock(user_email):
+                try:
+                    changed = self._compact_user(user_email)
+                except Exception as e:
+                    print(f"Compaction failed for {user_email}: {e}")
+                    continue
+                if changed:
+                    compacted.append(user_email)
+        
+        if compacted:
+            if self.write_behind:
+                with self.log_lock:
+                    self.dirty = True
+                self.flush_event.set()
+            else:
+                with self.flush_lock:
+                    self.save_profiles()
+        return compacted
+    
+    def _compact_loop(self):
+        while True:
+            time.sleep(self.compact_interval)
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Profile compaction failed: {e}")
+    
+    def get_size_report(self, user_email=None):
+        """Serialized size and record counts per user"""
+        user_emails = [user_email] if user_email else list(self.profiles)
+        report = {}
+        for email in user_emails:
+            if email not in self.profiles:
+                continue
+            with self._user_lock(email):
+                profile = self.profiles[email]
+                report[email] = {
+                    'bytes': len(json.dumps(profile)),
+                    'sessions': len(profile.get('sessions', [])),
+                    'session_rollups': len(profile.get('session_rollups', {})),
+                    'ats_history': len(profile.get('ats_history', [])),
+                    'total_sessions': profile.get('performance_metrics', {}).get('total_sessions', 0)
+                }
+        return report
+    
     def get_user_profile(self, user_email):
         return self.profiles.get(user_email, {})
     
+    def get_profile_version(self, user_email):
+        profile = self.profiles.get(user_email)
+        return profile.get('version', 0) if profile else 0
+    
+    def get_profile_page(self, user_email, fields=None, session_fields=None, limit=None, cursor=None):
+        """Projected view of a profile with cursor pagination over sessions.
+        
+        fields selects top-level keys, session_fields selects keys within each
+        session ('answer_count' is derived, so summaries can drop answers).
+        Pages run newest to oldest: cursor is the id of the oldest session on
+        the previous page, and next_cursor is None on the last page.
+        """
+        if user_email not in self.profiles:
+            return {}
+        
+        with tracer.span('profile.page'), self._user_lock(user_email):
+            profile = self.profiles[user_email]
+            sessions = profile.get('sessions', [])
+            
+            end = len(sessions)
+            if cursor:
+                ids = [s.get('id') for s in sessions]
+                if cursor not in ids:
+                    raise ValueError("Unknown cursor")
+                end = ids.index(cursor)
+            start = max(0, end - limit) if limit else 0
+            page = sessions[start:end]
+            
+            if session_fields:
+                page = [
+                    {
+                        key: len(s.get('answers', {})) if key == 'answer_count' else s.get(key)
+                        for key in session_fields
+                    }
+                    for s in page
+                ]
+            
+            result = {
+                key: value for key, value in profile.items()
+                if key != 'sessions' and (not fields or key in fields)
+            }
+            if not fields or 'sessions' in fields:
+                result['sessions'] = page
+                result['pagination'] = {
+                    'total': len(sessions),
+                    'limit': limit,
+                    'next_cursor': sessions[start].get('id') if limit and start > 0 else None
+                }
+            return json.loads(json.dumps(result))
+    
     def get_personalized_job_criteria(self, user_email):
         profile = self.get_user_profile(user_email)
         if not profile:
@@ -474,10 +1666,26 @@ class UserProfile:
             'total_sessions': metrics.get('total_sessions', 0)
         }
 
+_profile_store = None
+_profile_store_lock = threading.Lock()
+
+def get_profile_store():
+    """The server's shared UserProfile, built on first use.
+    
+    Building the store replays and takes over the write-behind log, so it
+    only happens when a route needs it; importing this module (e.g. for
+    the ingest CLI) leaves the log alone.
+    """
+    global _profile_store
+    with _profile_store_lock:
+        if _profile_store is None:
+            _profile_store = UserProfile()
+        return _profile_store
+
 class JobSearcher:
-    def __init__(self):
+    def __init__(self, user_profile=None):
         self.serpapi_key = os.getenv('SERPAPI_KEY')
-        self.user_profile = UserProfile()
+        self.user_profile = user_profile
     
     def search_jobs(self, resume_data, ats_analysis, interview_score=0, user_email=None):
         # Build comprehensive job criteria from ALL available data
@@ -497,7 +1705,8 @@ class JobSearcher:
         
         # Add user profile data if available
         if user_email:
-            profile_criteria = self.user_profile.get_personalized_job_criteria(user_email)
+            profile_store = self.user_profile or get_profile_store()
+            profile_criteria = profile_store.get_personalized_job_criteria(user_email)
             if profile_criteria:
                 job_criteria.update(profile_criteria)
         
@@ -682,12 +1891,230 @@ class JobSearcher:
         
         return tech_skills[:5]  # Return top 5 tech skills
 
+def _extract_resume_text(file_path):
+    """Process-pool worker: extract text from one resume file"""
+    started = time.monotonic()
+    try:
+        file_type = 'pdf' if file_path.lower().endswith('.pdf') else 'docx'
+        extractor = ResumeParser()
+        if file_type == 'pdf':
+            text = extractor.extract_text_from_pdf(file_path)
+        else:
+            text = extractor.extract_text_from_docx(file_path)
+        return file_path, text, time.monotonic() - started, None
+    except Exception as e:
+        return file_path, None, time.monotonic() - started, str(e)
+
+class BulkIngestor:
+    """Offline batch parsing and ATS scoring of resume files.
+    
+    Text extraction runs in a process pool; LLM calls run on a bounded
+    thread pool through the shared gateway. Results are appended to a
+    JSONL file as they finish and each finished path is recorded in a
+    checkpoint file, so rerunning the same command skips completed work
+    (files that failed extraction or only got fallback output are retried).
+    Each record carries an 'attempt' number; when a path appears more than
+    once in the output, the record with the highest attempt supersedes the
+    earlier ones.
+    The parser and analyzer should use a blocking gateway so LLM calls
+    wait for a slot rather than degrading under batch load.
+    """
+    def __init__(self, resume_parser, ats_analyzer, workers=None, llm_concurrency=None, include_text=False):
+        self.resume_parser = resume_parser
+        self.ats_analyzer = ats_analyzer
+        self.workers = workers or os.cpu_count() or 1
+        self.llm_concurrency = llm_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', '4'))
+        self.include_text = include_text
+        self.timings = {'extract': [], 'parse_llm': [], 'ats_llm': []}
+    
+    def collect_paths(self, source):
+        """Resume paths from a directory tree or a manifest (one path per line, or JSONL with "path")"""
+        if os.path.isdir(source):
+            paths = []
+            for root, _, files in os.walk(source):
+                for name in sorted(files):
+                    if name.lower().endswith(('.pdf', '.docx')):
+                        paths.append(os.path.join(root, name))
+            return sorted(paths)
+        
+        paths = []
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                path = json.loads(line)['path'] if line.startswith('{') else line
+                paths.append(path if os.path.isabs(path) else os.path.join(base_dir, path))
+        return paths
+    
+    def _load_checkpoint(self, checkpoint_file):
+        try:
+            with open(checkpoint_file, 'r') as f:
+                return {line.rstrip('\n') for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+    
+    def _load_attempts(self, output_file, paths):
+        """Records already written for each path by earlier runs"""
+        attempts = {}
+        try:
+            with open(output_file, 'r') as f:
+                for line in f:
+                    try:
+                        path = json.loads(line).get('path')
+                    except json.JSONDecodeError:
+                        continue
+                    if path in paths:
+                        attempts[path] = attempts.get(path, 0) + 1
+        except FileNotFoundError:
+            pass
+        return attempts
+    
+    def _score(self, file_path, text, extract_seconds):
+        started = time.monotonic()
+        parsed = self.resume_parser.parse_with_llm(text)
+        parsed_at = time.monotonic()
+        ats = self.ats_analyzer.analyze_ats_score(parsed)
+        finished = time.monotonic()
+        
+        if self.include_text:
+            parsed['raw_text'] = text
+        return {
+            'path': file_path,
+            'resume': parsed,
+            'ats': ats,
+            'degraded': bool(parsed.get('degraded') or ats.get('degraded')),
+            'timings': {
+                'extract': round(extract_seconds, 4),
+                'parse_llm': round(parsed_at - started, 4),
+                'ats_llm': round(finished - parsed_at, 4)
+            }
+        }
+    
+    def run(self, source, output_file, checkpoint_file=None):
+        checkpoint_file = checkpoint_file or output_file + '.checkpoint'
+        done = self._load_checkpoint(checkpoint_file)
+        all_paths = self.collect_paths(source)
+        paths = [p for p in all_paths if p not in done]
+        attempts = self._load_attempts(output_file, set(paths))
+        summary = {'total': len(all_paths), 'skipped': len(all_paths) - len(paths), 'processed': 0, 'errors': 0, 'degraded': 0}
+        
+        started = time.monotonic()
+        max_ahead = self.llm_concurrency * 2
+        path_iter = iter(paths)
+        extracting = set()
+        scoring = set()
+        scoring_paths = {}
+        exhausted = False
+        
+        with open(output_file, 'a') as out, open(checkpoint_file, 'a') as checkpoint, \
+                ProcessPoolExecutor(max_workers=self.workers) as procs, \
+                ThreadPoolExecutor(max_workers=self.llm_concurrency) as threads:
+            
+            def emit(record):
+                record['attempt'] = attempts.get(record['path'], 0) + 1
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+                summary['processed'] += 1
+                # Errors and degraded (fallback) results aren't checkpointed,
+                # so a rerun retries them
+                if record.get('error'):
+                    summary['errors'] += 1
+                elif record['degraded']:
+                    summary['degraded'] += 1
+                else:
+                    checkpoint.write(record['path'] + '\n')
+                    checkpoint.flush()
+                if summary['processed'] % 50 == 0:
+                    elapsed = time.monotonic() - started
+                    print(f"{summary['processed']}/{len(paths)} resumes, {summary['processed'] / elapsed:.2f}/s", file=sys.stderr)
+            
+            while True:
+                # Keep extraction only a little ahead of the LLM stage
+                while not exhausted and len(extracting) + len(scoring) < max_ahead:
+                    file_path = next(path_iter, None)
+                    if file_path is None:
+                        exhausted = True
+                    else:
+                        extracting.add(procs.submit(_extract_resume_text, file_path))
+                
+                if not extracting and not scoring:
+                    break
+                
+                finished, _ = wait(extracting | scoring, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in extracting:
+                        extracting.discard(future)
+                        file_path, text, extract_seconds, error = future.result()
+                        self.timings['extract'].append(extract_seconds)
+                        if error:
+                            emit({'path': file_path, 'error': error, 'degraded': False})
+                        else:
+                            future = threads.submit(self._score, file_path, text, extract_seconds)
+                            scoring.add(future)
+                            scoring_paths[future] = file_path
+                    else:
+                        scoring.discard(future)
+                        try:
+                            record = future.result()
+                        except Exception as e:
+                            emit({'path': scoring_paths.pop(future), 'error': str(e), 'degraded': False})
+                            continue
+                        scoring_paths.pop(future)
+                        self.timings['parse_llm'].append(record['timings']['parse_llm'])
+                        self.timings['ats_llm'].append(record['timings']['ats_llm'])
+                        emit(record)
+        
+        elapsed = time.monotonic() - started
+        summary['elapsed_seconds'] = round(elapsed, 2)
+        summary['throughput_per_second'] = round(summary['processed'] / elapsed, 3) if elapsed else 0
+        summary['stage_timings'] = {stage: self._describe(values) for stage, values in self.timings.items()}
+        return summary
+    
+    def _describe(self, values):
+        if not values:
+            return {'count': 0}
+        ordered = sorted(values)
+        return {
+            'count': len(ordered),
+            'mean': round(sum(ordered) / len(ordered), 4),
+            'p50': round(ordered[len(ordered) // 2], 4),
+            'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            'max': round(ordered[-1], 4),
+            'total': round(sum(ordered), 2)
+        }
+
+def run_ingest_cli(argv):
+    arg_parser = argparse.ArgumentParser(
+        prog='python app.py ingest',
+        description='Parse and ATS-score a batch of PDF/DOCX resumes into JSONL.'
+    )
+    arg_parser.add_argument('source', help='Directory to walk, or a manifest of paths (text or JSONL with "path")')
+    arg_parser.add_argument('-o', '--output', default='ingest_results.jsonl', help='JSONL results file (appended)')
+    arg_parser.add_argument('--checkpoint', help='Checkpoint file (default: <output>.checkpoint)')
+    arg_parser.add_argument('--workers', type=int, help='Text extraction processes (default: CPU count)')
+    arg_parser.add_argument('--llm-concurrency', type=int, help='Concurrent LLM calls (default: LLM_MAX_CONCURRENCY)')
+    arg_parser.add_argument('--include-text', action='store_true', help='Include raw resume text in results')
+    args = arg_parser.parse_args(argv)
+    
+    gateway = LLMGateway(blocking=True)
+    ingestor = BulkIngestor(
+        ResumeParser(gateway),
+        ATSAnalyzer(gateway),
+        workers=args.workers,
+        llm_concurrency=args.llm_concurrency,
+        include_text=args.include_text
+    )
+    summary = ingestor.run(args.source, args.output, args.checkpoint)
+    summary['llm'] = gateway.get_stats()
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 1 if summary['errors'] or summary['degraded'] else 0
+
 parser = ResumeParser()
 question_generator = QuestionGenerator()
 ats_analyzer = ATSAnalyzer()
 # Moved to end of file
-job_searcher = JobSearcher()
-user_profile = UserProfile()
 
 @app.route('/')
 def index():
@@ -767,24 +2194,79 @@ def record_session():
             'timestamp': data.get('timestamp'),
             'answers': data.get('answers', {}),
             'scores': data.get('scores', {}),
+            'analysis': data.get('analysis', {}),
             'completion_rate': data.get('completion_rate', 0),
+            'avg_score': data.get('avg_score', 0),
             'ats_data': data.get('ats_data')
         }
         
-        user_profile.record_session(user_email, session_data)
+        get_profile_store().record_session(user_email, session_data)
         return jsonify({"success": True})
     
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/user-profile/<user_email>', methods=['GET'])
 def get_user_profile(user_email):
+    """Profile with optional paging (limit, cursor), projection (fields,
+    session_fields) and ETag revalidation against the profile version"""
     try:
-        profile = user_profile.get_user_profile(user_email)
-        return jsonify(profile)
+        fields = [f for f in request.args.get('fields', '').split(',') if f]
+        session_fields = [f for f in request.args.get('session_fields', '').split(',') if f]
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        if 'limit' in request.args and (limit is None or limit < 1):
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        
+        profile_store = get_profile_store()
+        if user_email not in profile_store.profiles:
+            # Nothing to revalidate against (If-None-Match: * must not match)
+            return jsonify({})
+        
+        version = profile_store.get_profile_version(user_email)
+        variant = hashlib.md5(request.query_string).hexdigest()[:8]
+        etag = f"{version}-{variant}"
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            profile = profile_store.get_profile_page(user_email, fields, session_fields, limit, cursor)
+            response = jsonify(profile)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/llm-stats', methods=['GET'])
+def llm_stats():
+    stats = llm_gateway.get_health()
+    stats['calls'] = llm_gateway.get_stats()
+    return jsonify(stats)
+
+@app.route('/profile-size-report', methods=['GET'])
+def profile_size_report():
+    """Size report for one user; all users only with PROFILE_SIZE_REPORT_ALL=true"""
+    try:
+        user_email = request.args.get('user_email')
+        if not user_email and os.getenv('PROFILE_SIZE_REPORT_ALL', 'False').lower() != 'true':
+            return jsonify({"error": "Missing user_email parameter"}), 400
+        return jsonify(get_profile_store().get_size_report(user_email))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/debug/traces', methods=['GET'])
+def debug_traces():
+    # Trace names include request paths (and so user emails); opt in separately
+    if os.getenv('TRACE_DEBUG_ENDPOINT', 'False').lower() != 'true':
+        return jsonify({"error": "Not found"}), 404
+    limit = request.args.get('limit', 50, type=int)
+    min_ms = request.args.get('min_ms', 0, type=float)
+    return jsonify({'traces': tracer.recent(limit, min_ms)})
+
 @app.route('/parse', methods=['POST'])
 def parse_resume():
     if 'file' not in request.files:
@@ -800,7 +2282,8 @@ def parse_resume():
     try:
         # Save uploaded file temporarily
         file_path = f"/tmp/{file.filename}"
-        file.save(file_path)
+        with tracer.span('file.save'):
+            file.save(file_path)
         
         # Determine file type
         file_type = 'pdf' if file.filename.lower().endswith('.pdf') else 'docx'
@@ -822,8 +2305,10 @@ question_generator = QuestionGenerator()
 ats_analyzer = ATSAnalyzer()
 answer_analyzer = AnswerAnalyzer()
 job_searcher = JobSearcher()
-user_profile = UserProfile()
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'ingest':
+        sys.exit(run_ingest_cli(sys.argv[2:]))
+    
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     app.run(debug=debug_mode, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -71,7 +71,13 @@ function App() {
 
   const fetchUserHistory = async (email) => {
     try {
-      const response = await axios.get(`/user-profile/${email}`);
+      const response = await axios.get(`/user-profile/${email}`, {
+        params: {
+          fields: 'performance_metrics,sessions,ats_history',
+          session_fields: 'id,timestamp,avg_score,answer_count',
+          limit: 3
+        }
+      });
       setUserHistory(response.data);
     } catch (err) {
       console.error('Failed to fetch user history:', err);
@@ -417,7 +423,7 @@ function App() {
                 <div className="text-sm text-gray-600">Average Score</div>
               </div>
               <div className="bg-purple-50 p-4 rounded-lg text-center">
-                <div className="text-2xl font-bold text-purple-600">{userHistory.sessions?.length || 0}</div>
+                <div className="text-2xl font-bold text-purple-600">{userHistory.performance_metrics?.total_sessions || 0}</div>
                 <div className="text-sm text-gray-600">Interview Sessions</div>
               </div>
               <div className="bg-orange-50 p-4 rounded-lg text-center">
@@ -437,7 +443,7 @@ function App() {
                       </span>
                       <div className="flex gap-2">
                         <span className="text-sm bg-blue-100 text-blue-800 px-2 py-1 rounded">
-                          {Object.keys(session.answers || {}).length} answers
+                          {session.answer_count ?? Object.keys(session.answers || {}).length} answers
                         </span>
                         <span className={`text-sm px-2 py-1 rounded ${
                           (session.avg_score || 0) >= 80 ? 'bg-green-100 text-green-800' :
@@ -0,0 +1,74 @@
+"""LLM gateway counters against a stub Bedrock client (run with pytest)."""
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from app import LLMGateway, MAX_REPAIR_TOKENS, STRUCTURED_OUTPUTS
+
+
+class StubBedrockClient:
+    """Stand-in for the bedrock-runtime client that replays canned responses"""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+    
+    def invoke_model(self, modelId, body):
+        self.requests.append(json.loads(body))
+        return {'body': io.BytesIO(json.dumps(self.responses.pop(0)).encode())}
+
+
+def sample_for_schema(schema):
+    """Smallest value that satisfies one of our response schemas"""
+    expected = schema.get('type')
+    if isinstance(expected, list):
+        expected = next(t for t in expected if t != 'null')
+    if expected == 'object':
+        return {key: sample_for_schema(schema['properties'][key]) for key in schema.get('required', [])}
+    return {'array': [], 'string': 'x', 'number': 1, 'integer': 1, 'boolean': True}[expected]
+
+
+@pytest.mark.parametrize('call_type', sorted(STRUCTURED_OUTPUTS))
+def test_parse_failure_and_wasted_token_counters(call_type):
+    # Four calls: a clean tool call, JSON wrapped in text (local repair), a
+    # truncated tool call followed by a good repair, and two unusable
+    # outputs (fallback)
+    spec = STRUCTURED_OUTPUTS[call_type]
+    good = sample_for_schema(spec['schema'])
+    tool_use = lambda data: {'type': 'tool_use', 'name': spec['tool_name'], 'input': data}
+    client = StubBedrockClient([
+        {'content': [tool_use(good)], 'usage': {'output_tokens': 10}, 'stop_reason': 'tool_use'},
+        {'content': [{'type': 'text', 'text': 'Here you go: ' + json.dumps(good)[:-1]}], 'usage': {'output_tokens': 20}, 'stop_reason': 'end_turn'},
+        {'content': [tool_use({})], 'usage': {'output_tokens': 30}, 'stop_reason': 'max_tokens'},
+        {'content': [tool_use(good)], 'usage': {'output_tokens': 40}, 'stop_reason': 'tool_use'},
+        {'content': [{'type': 'text', 'text': 'no'}], 'usage': {'output_tokens': 50}, 'stop_reason': 'end_turn'},
+        {'content': [{'type': 'text', 'text': 'still no'}], 'usage': {'output_tokens': 60}, 'stop_reason': 'end_turn'}
+    ])
+    gateway = LLMGateway(client=client)
+    
+    results = [gateway.invoke_structured(call_type, 'prefix', 'suffix') for _ in range(4)]
+    stats = gateway.get_stats()[call_type]
+    
+    assert results[0] == good
+    assert results[3] is None
+    assert {key: stats[key] for key in (
+        'calls', 'parse_failures', 'local_repairs', 'llm_repairs', 'fallbacks',
+        'truncations', 'output_tokens', 'wasted_output_tokens'
+    )} == {
+        'calls': 4,
+        'parse_failures': 3,
+        'local_repairs': 1,
+        'llm_repairs': 1,
+        'fallbacks': 1,
+        'truncations': 1,
+        'output_tokens': 210,
+        'wasted_output_tokens': 30 + 50 + 60
+    }
+    # The repair after a truncated call gets a larger budget
+    route_tokens = gateway.routes[call_type]['max_tokens']
+    assert client.requests[3]['max_tokens'] == min(route_tokens * 2, MAX_REPAIR_TOKENS)